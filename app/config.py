@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import os
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    """Tunables read from the environment once at import.
+
+    Immutable for the lifetime of the process; modules check attributes
+    instead of polling os.environ on hot paths.
+    """
+
+    judge_summary_every_turns: int = 2
+    judge_summary_max_tokens: int = 120
+    round_parallel: bool = False
+    use_stop: bool = True
+    stream: bool = False
+    context_token_budget: int = 800
+    log_token_usage: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            judge_summary_every_turns=int(os.getenv("JUDGE_SUMMARY_EVERY_TURNS", "2")),
+            judge_summary_max_tokens=int(os.getenv("JUDGE_SUMMARY_MAX_TOKENS", "120")),
+            round_parallel=os.getenv("ROUND_PARALLEL", "0") == "1",
+            use_stop=os.getenv("GROQ_USE_STOP", "1") == "1",
+            stream=os.getenv("GROQ_STREAM", "0") == "1",
+            context_token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "800")),
+            log_token_usage=bool(os.getenv("LOG_TOKEN_USAGE")),
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build Settings on first use (after load_dotenv has run)."""
+    return Settings.from_env()
@@ -1,8 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import functools
+import logging
 import os
+import queue
+import threading
+import time
+import cachetools
+import orjson
 import psycopg
-from typing import Optional, List, Dict, Any
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+from typing import Optional, List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Canonical (and only) home of the DB helpers; import from here so the
+# process never grows a second pool or writer.
+__all__ = [
+    "apply_migration",
+    "create_debate_session",
+    "create_debate_session_async",
+    "end_debate_session",
+    "end_debate_session_async",
+    "ensure_topic",
+    "ensure_topics_bulk",
+    "get_usage_summary",
+    "insert_message",
+    "insert_usage",
+]
 
 
 def apply_migration(database_url: str, sql_file_path: str) -> None:
@@ -19,10 +47,201 @@ def apply_migration(database_url: str, sql_file_path: str) -> None:
 
 # === Lightweight runtime helpers (sync) ===
 
+@functools.lru_cache(maxsize=1)
 def _get_db_url() -> Optional[str]:
+    # Read once; every helper checks this on its hot path
     return os.getenv("DATABASE_URL")
 
 
+# Shared connection pool: paying TCP/TLS/auth per helper call dominates wall
+# time under load, so all helpers borrow from one lazily created pool.
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+# Oversized pools hurt throughput more than they help; default to the
+# (cores*2)+spindles heuristic and hard-cap PG_POOL_MAX at 35.
+_POOL_MAX_CAP = 35
+
+
+def _pool_max_size() -> int:
+    default = min(2 * (os.cpu_count() or 4) + 2, 20)
+    return min(int(os.getenv("PG_POOL_MAX", str(default))), _POOL_MAX_CAP)
+
+
+def _get_pool() -> ConnectionPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ConnectionPool(
+                    _get_db_url(),
+                    min_size=int(os.getenv("PG_POOL_MIN", "2")),
+                    max_size=_pool_max_size(),
+                    kwargs={"autocommit": False},
+                    num_workers=2,
+                    timeout=10,
+                )
+    return _POOL
+
+
+atexit.register(lambda: _POOL and _POOL.close())
+
+
+# Async twin of the pool above for callers living on the event loop
+# (orchestrator paths); keeps the sync pool for CLI/scheduler use.
+_APOOL: Optional[AsyncConnectionPool] = None
+_APOOL_LOCK = asyncio.Lock()
+
+
+async def _get_apool() -> AsyncConnectionPool:
+    global _APOOL
+    if _APOOL is None:
+        async with _APOOL_LOCK:
+            if _APOOL is None:
+                pool = AsyncConnectionPool(
+                    _get_db_url(),
+                    min_size=int(os.getenv("PG_POOL_MIN", "2")),
+                    max_size=_pool_max_size(),
+                    kwargs={"autocommit": False},
+                    num_workers=2,
+                    timeout=10,
+                    open=False,
+                )
+                await pool.open()
+                _APOOL = pool
+    return _APOOL
+
+
+# === Batched background writer for high-rate log tables ===
+#
+# Each bot turn logs a message row and a usage row; doing those as
+# synchronous single-row inserts blocks the caller on network I/O per row.
+# insert_message/insert_usage enqueue instead, and a daemon thread drains
+# the queue every FLUSH_INTERVAL_MS (or at _FLUSH_MAX_ROWS rows, whichever
+# comes first) into multi-row executemany batches - one commit per batch.
+
+_MESSAGE_INSERT_SQL = """
+    insert into messages (session_id, bot_id, role, content, telegram_msg_id)
+    values (%s, NULL, %s, %s, %s)
+"""
+
+_USAGE_INSERT_SQL = """
+    insert into llm_usage (
+        session_id, chat_id, thread_id, provider, model_name, role,
+        prompt_tokens, completion_tokens, total_tokens, meta
+    ) values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)
+"""
+
+_USAGE_ROLLUP_SQL = """
+    insert into llm_usage_hourly (
+        bucket, chat_id, thread_id, provider, model_name,
+        prompt_tokens, completion_tokens, total_tokens
+    ) values (date_trunc('hour', now()), %s, coalesce(%s, 0), %s, %s, %s, %s, %s)
+    on conflict (bucket, chat_id, thread_id, provider, model_name) do update
+    set prompt_tokens = llm_usage_hourly.prompt_tokens + excluded.prompt_tokens,
+        completion_tokens = llm_usage_hourly.completion_tokens + excluded.completion_tokens,
+        total_tokens = llm_usage_hourly.total_tokens + excluded.total_tokens
+"""
+
+# Provider-specific aliases for token-count fields, canonical name first
+_PT_KEYS = ("prompt_tokens", "prompt_token_count", "input_tokens")
+_CT_KEYS = ("completion_tokens", "candidates_token_count", "output_tokens")
+_TT_KEYS = ("total_tokens", "total_token_count")
+
+_FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL_MS", "500")) / 1000.0
+_FLUSH_MAX_ROWS = 100
+
+# Bounded so a stalled database can never grow the queue without limit;
+# overflow drops the row (chat keeps flowing) and bumps a counter
+_WRITE_QUEUE_MAX = int(os.getenv("DB_WRITE_QUEUE_MAX", "1024"))
+_write_queue: "queue.Queue[Tuple[str, tuple]]" = queue.Queue(maxsize=_WRITE_QUEUE_MAX)
+_dropped_writes = 0
+_writer_started = False
+_writer_lock = threading.Lock()
+
+
+def _enqueue_write(kind: str, row: tuple) -> bool:
+    global _dropped_writes
+    _ensure_writer()
+    try:
+        _write_queue.put_nowait((kind, row))
+        return True
+    except queue.Full:
+        _dropped_writes += 1
+        if _dropped_writes % 100 == 1:
+            logger.warning("[db_writer] queue full; dropped %d writes so far", _dropped_writes)
+        return False
+
+
+def _ensure_writer() -> None:
+    global _writer_started
+    if _writer_started:
+        return
+    with _writer_lock:
+        if not _writer_started:
+            threading.Thread(target=_writer_loop, name="db-writer", daemon=True).start()
+            _writer_started = True
+
+
+def _writer_loop() -> None:
+    while True:
+        batch = [_write_queue.get()]
+        deadline = time.monotonic() + _FLUSH_INTERVAL
+        while len(batch) < _FLUSH_MAX_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _flush_batch(batch)
+
+
+def _flush_batch(batch: List[Tuple[str, tuple]]) -> None:
+    messages = [params for kind, params in batch if kind == "message"]
+    usages = [params for kind, params in batch if kind == "usage"]
+    # Separate transactions so a failing rollup (e.g. migration 004 not
+    # applied yet) can never roll back the message log as well
+    if messages:
+        try:
+            with _get_pool().connection() as conn:
+                with conn.cursor() as cur:
+                    cur.executemany(_MESSAGE_INSERT_SQL, messages)
+        except Exception:
+            logger.warning("[db_writer] message flush failed (%d rows)", len(messages), exc_info=True)
+    if usages:
+        try:
+            with _get_pool().connection() as conn:
+                with conn.cursor() as cur:
+                    cur.executemany(_USAGE_INSERT_SQL, usages)
+                    # Maintain the hourly rollup read by get_usage_summary;
+                    # usage params are (session_id, chat_id, thread_id,
+                    # provider, model_name, role, pt, ct, tt, meta)
+                    cur.executemany(
+                        _USAGE_ROLLUP_SQL,
+                        [(p[1], p[2], p[3], p[4], p[6], p[7], p[8]) for p in usages],
+                    )
+        except Exception:
+            logger.warning("[db_writer] usage flush failed (%d rows)", len(usages), exc_info=True)
+
+
+def _drain_on_exit() -> None:
+    batch: List[Tuple[str, tuple]] = []
+    while True:
+        try:
+            batch.append(_write_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        _flush_batch(batch)
+
+
+# Registered after the pool close above: atexit runs LIFO, so the drain
+# happens while the pool is still open.
+atexit.register(_drain_on_exit)
+
+
 def create_debate_session(chat_id: int, topic_title: str) -> Optional[str]:
     """Create (or reuse) a topic by title and insert an active debate session. Returns session_id.
     Returns None if DATABASE_URL is missing or on error.
@@ -31,28 +250,25 @@ def create_debate_session(chat_id: int, topic_title: str) -> Optional[str]:
     if not db_url:
         return None
     try:
-        with psycopg.connect(db_url) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
-                # Get or create topic id
-                cur.execute("select id from topics where title = %s limit 1", (topic_title,))
-                row = cur.fetchone()
-                if row:
-                    topic_id = row[0]
-                else:
-                    cur.execute("insert into topics (title) values (%s) returning id", (topic_title,))
-                    topic_id = cur.fetchone()[0]
-
-                # Create session with empty turn_order for now (uuid[])
+                # Upsert topic and create session (empty turn_order for now)
+                # atomically in a single round trip via a CTE
                 cur.execute(
                     """
+                    with t as (
+                        insert into topics (title) values (%s)
+                        on conflict (title) do update set title = excluded.title
+                        returning id
+                    )
                     insert into debate_sessions (topic_id, chat_id, status, turn_order)
-                    values (%s, %s, 'active', ARRAY[]::uuid[])
+                    select id, %s, 'active', ARRAY[]::uuid[] from t
                     returning id
                     """,
-                    (topic_id, chat_id),
+                    (topic_title, chat_id),
+                    prepare=True,
                 )
                 session_id = cur.fetchone()[0]
-            conn.commit()
         return str(session_id)
     except Exception:
         return None
@@ -64,13 +280,72 @@ def end_debate_session(session_id: str) -> bool:
     if not db_url:
         return False
     try:
-        with psycopg.connect(db_url) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     "update debate_sessions set status='ended', ended_at = now() where id = %s",
                     (session_id,),
+                    prepare=True,
+                )
+        return True
+    except Exception:
+        return False
+
+
+def _pick_int(d: Dict[str, Any], keys: Tuple[str, ...]) -> int:
+    """Return the first numeric value under any of keys, coerced to int."""
+    for k in keys:
+        v = d.get(k)
+        if isinstance(v, (int, float)):
+            return int(v)
+        if isinstance(v, str) and v.lstrip("-").isdigit():
+            return int(v)
+    return 0
+
+
+async def create_debate_session_async(chat_id: int, topic_title: str) -> Optional[str]:
+    """Async variant of create_debate_session for event-loop callers."""
+    db_url = _get_db_url()
+    if not db_url:
+        return None
+    try:
+        apool = await _get_apool()
+        async with apool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    with t as (
+                        insert into topics (title) values (%s)
+                        on conflict (title) do update set title = excluded.title
+                        returning id
+                    )
+                    insert into debate_sessions (topic_id, chat_id, status, turn_order)
+                    select id, %s, 'active', ARRAY[]::uuid[] from t
+                    returning id
+                    """,
+                    (topic_title, chat_id),
+                    prepare=True,
+                )
+                session_id = (await cur.fetchone())[0]
+        return str(session_id)
+    except Exception:
+        return None
+
+
+async def end_debate_session_async(session_id: str) -> bool:
+    """Async variant of end_debate_session for event-loop callers."""
+    db_url = _get_db_url()
+    if not db_url:
+        return False
+    try:
+        apool = await _get_apool()
+        async with apool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "update debate_sessions set status='ended', ended_at = now() where id = %s",
+                    (session_id,),
+                    prepare=True,
                 )
-            conn.commit()
         return True
     except Exception:
         return False
@@ -86,114 +361,88 @@ def insert_usage(
     usage: Dict[str, Any] | None,
     meta: Dict[str, Any] | None = None,
 ) -> bool:
-    """Insert token usage row. Returns False when DATABASE_URL missing or on error."""
+    """Queue a token usage row for the batched writer. Returns False when DATABASE_URL missing or on error."""
     db_url = _get_db_url()
     if not db_url or not usage:
         return False
     try:
         # Normalize token keys from different providers
-        def _get_int(d: Dict[str, Any], *keys: str) -> int:
-            for k in keys:
-                if k in d and d[k] is not None:
-                    try:
-                        return int(d[k])
-                    except Exception:
-                        pass
-            return 0
-
-        pt = _get_int(usage, "prompt_tokens", "prompt_token_count", "input_tokens")
-        ct = _get_int(usage, "completion_tokens", "candidates_token_count", "output_tokens")
-        tt = _get_int(usage, "total_tokens", "total_token_count")
+        pt = _pick_int(usage, _PT_KEYS)
+        ct = _pick_int(usage, _CT_KEYS)
+        tt = _pick_int(usage, _TT_KEYS)
         if tt == 0:
             tt = pt + ct
 
-        # Meta stores raw usage data if provided
+        # Meta stores raw usage data under 'raw' if provided
         meta_payload: Dict[str, Any] = meta.copy() if meta else {}
-        # Put raw usage under 'raw'
-        if "raw" in usage:
-            meta_payload["raw"] = usage["raw"]
-        else:
-            meta_payload["raw"] = usage
+        meta_payload["raw"] = usage.get("raw", usage)
 
-        with psycopg.connect(db_url) as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    insert into llm_usage (
-                        session_id, chat_id, thread_id, provider, model_name, role,
-                        prompt_tokens, completion_tokens, total_tokens, meta
-                    ) values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        session_id,
-                        chat_id,
-                        thread_id,
-                        provider,
-                        model_name,
-                        role,
-                        pt,
-                        ct,
-                        tt,
-                        psycopg.types.json.Json(meta_payload),
-                    ),
-                )
-            conn.commit()
-        return True
+        return _enqueue_write(
+            "usage",
+            (
+                session_id,
+                chat_id,
+                thread_id,
+                provider,
+                model_name,
+                role,
+                pt,
+                ct,
+                tt,
+                # Pre-serialized with orjson (C-speed) instead of the
+                # stdlib json dump inside psycopg's Json adapter
+                orjson.dumps(meta_payload).decode(),
+            ),
+        )
     except Exception:
         return False
 
 
+# Summaries are typically requested in bursts; a short TTL skips the
+# round trip + aggregation on repeats at the cost of <=10 s staleness
+_summary_cache: "cachetools.TTLCache" = cachetools.TTLCache(maxsize=256, ttl=10)
+_summary_cache_lock = threading.Lock()
+
+
 def get_usage_summary(chat_id: int, hours: int = 24, thread_id: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
     """Aggregate usage by provider/model in the last N hours. Returns list of dicts or None."""
     db_url = _get_db_url()
     if not db_url:
         return None
+    key = (chat_id, thread_id, hours)
+    with _summary_cache_lock:
+        cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        with psycopg.connect(db_url) as conn:
-            with conn.cursor() as cur:
-                if thread_id is not None:
-                    cur.execute(
-                        """
-                        select provider, model_name,
-                               coalesce(sum(prompt_tokens),0) as prompt_tokens,
-                               coalesce(sum(completion_tokens),0) as completion_tokens,
-                               coalesce(sum(total_tokens),0) as total_tokens
-                        from llm_usage
-                        where chat_id = %s
-                          and thread_id = %s
-                          and created_at > now() - make_interval(hours => %s)
-                        group by provider, model_name
-                        order by total_tokens desc
-                        """,
-                        (chat_id, thread_id, hours),
-                    )
-                else:
-                    cur.execute(
-                        """
-                        select provider, model_name,
-                               coalesce(sum(prompt_tokens),0) as prompt_tokens,
-                               coalesce(sum(completion_tokens),0) as completion_tokens,
-                               coalesce(sum(total_tokens),0) as total_tokens
-                        from llm_usage
-                        where chat_id = %s
-                          and created_at > now() - make_interval(hours => %s)
-                        group by provider, model_name
-                        order by total_tokens desc
-                        """,
-                        (chat_id, hours),
-                    )
+        with _get_pool().connection() as conn:
+            # dict_row yields the result shape directly; the SQL aliases
+            # already match the desired keys and coalesce(...) guarantees ints
+            with conn.cursor(row_factory=dict_row) as cur:
+                # Read the hourly rollup (O(buckets), hour granularity)
+                # instead of scanning raw llm_usage rows; single statement
+                # text for both the thread-scoped and chat-wide cases keeps
+                # one prepared plan on the backend
+                cur.execute(
+                    """
+                    select provider, model_name,
+                           coalesce(sum(prompt_tokens),0) as prompt_tokens,
+                           coalesce(sum(completion_tokens),0) as completion_tokens,
+                           coalesce(sum(total_tokens),0) as total_tokens
+                    from llm_usage_hourly
+                    where chat_id = %s
+                      and (%s::bigint is null or thread_id = %s)
+                      and bucket > now() - make_interval(hours => %s)
+                    group by provider, model_name
+                    order by total_tokens desc
+                    """,
+                    (chat_id, thread_id, thread_id, hours),
+                    prepare=True,
+                )
                 rows = cur.fetchall()
-        result: List[Dict[str, Any]] = []
-        for r in rows:
-            result.append(
-                {
-                    "provider": r[0],
-                    "model_name": r[1],
-                    "prompt_tokens": int(r[2] or 0),
-                    "completion_tokens": int(r[3] or 0),
-                    "total_tokens": int(r[4] or 0),
-                }
-            )
+        result = list(rows)
+        with _summary_cache_lock:
+            _summary_cache[key] = result
         return result
     except Exception:
         return None
@@ -207,39 +456,47 @@ def ensure_topic(title: str, description: Optional[str] = None, tags: Optional[L
     if not db_url:
         return False
     try:
-        with psycopg.connect(db_url) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("select id from topics where title = %s limit 1", (title,))
-                row = cur.fetchone()
-                if row:
-                    return True
-                # Insert minimal fields; description/tags optional
+                # Single race-safe round trip; description/tags optional
                 cur.execute(
-                    "insert into topics (title, description, tags) values (%s, %s, %s)",
+                    "insert into topics (title, description, tags) values (%s, %s, %s) on conflict (title) do nothing",
                     (title, description, tags),
                 )
-            conn.commit()
         return True
     except Exception:
         return False
 
 
-def insert_message(session_id: str, content: str, telegram_msg_id: Optional[int] = None, role: str = "assistant") -> bool:
-    """Insert a message log. bot_id left null; role defaults to 'assistant'."""
+def ensure_topics_bulk(titles: List[str]) -> bool:
+    """Ensure every title exists, in one executemany round trip.
+
+    Returns True on success (or empty input); False if DATABASE_URL is
+    missing or the insert fails.
+    """
     db_url = _get_db_url()
     if not db_url:
         return False
+    if not titles:
+        return True
     try:
-        with psycopg.connect(db_url) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    insert into messages (session_id, bot_id, role, content, telegram_msg_id)
-                    values (%s, NULL, %s, %s, %s)
-                    """,
-                    (session_id, role, content, telegram_msg_id),
+                cur.executemany(
+                    "insert into topics (title) values (%s) on conflict (title) do nothing",
+                    [(t,) for t in titles],
                 )
-            conn.commit()
         return True
     except Exception:
         return False
+
+
+def insert_message(session_id: str, content: str, telegram_msg_id: Optional[int] = None, role: str = "assistant") -> bool:
+    """Queue a message log for the batched writer. bot_id left null; role defaults to 'assistant'."""
+    db_url = _get_db_url()
+    if not db_url:
+        return False
+    try:
+        return _enqueue_write("message", (session_id, role, content, telegram_msg_id))
+    except Exception:
+        return False
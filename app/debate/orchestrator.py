@@ -4,19 +4,44 @@ import asyncio
 import dataclasses
 import datetime as dt
 import contextlib
-import os
-from typing import Dict, List, Optional, Tuple
+import logging
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
 
 from aiogram import Bot
 
+from app.config import get_settings
 from app.llm.groq_client import GroqClient
 from app.db.supabase_client import (
-    create_debate_session,
-    end_debate_session,
+    create_debate_session_async,
+    end_debate_session_async,
     insert_message,
     insert_usage,
 )
 
+logger = logging.getLogger(__name__)
+
+
+# One constant template: a single .format() fill instead of a chain of
+# string concatenations every time a prefix is built
+_SYS_TEMPLATE = (
+    "{system_prompt}\n"
+    "Bahasa: Indonesia.\n"
+    "Instruksi penting: jangan menyalin atau menulis label/nama persona (mis. 'Alpha-001:', 'Beta-002:', 'Gamma-003:', 'Delta-004:') atau frasa 'Ringkasan Juri'. Mulai langsung dengan bullet poin, tanpa heading/prefiks nama.\n"
+    "Gaya: ringkas, maksimal 4 bullet dengan prefix '• '; kalimat pendek.\n"
+    "Respons: tanggapi 1–2 poin terakhir lawan secara spesifik (kutip singkat jika perlu).\n"
+    "Larangan: jangan mengulang poin yang sudah Anda sampaikan pada giliran sebelumnya.\n"
+    "Tambah: berikan minimal 1 argumen/analogi/contoh/data baru untuk maju ke depan.\n"
+    "Jika ada ringkasan juri di konteks, gunakan hanya sebagai rujukan; jangan tulis frasa 'Ringkasan Juri' dan jangan mengomentari juri.\n"
+    "Topik: {topic_title}\n"
+)
+
+
+def _build_sys_prefix(system_prompt: str, topic_title: str) -> str:
+    return _SYS_TEMPLATE.format(system_prompt=system_prompt, topic_title=topic_title)
+
 
 @dataclasses.dataclass
 class Persona:
@@ -33,9 +58,21 @@ class DebateSession:
     thread_id: Optional[int]
     topic_title: str
     personas_order: List[str]  # keys
+    # Invariant per session: len(personas_order) and the judge cadence
+    # modulus, cached so the hot turn path skips recomputing them
+    n_personas: int = 1
+    judge_modulus: int = 0
     active: bool = True
     turn_index: int = 0
-    history: List[Tuple[str, str]] = dataclasses.field(default_factory=list)  # (speaker_key, text)
+    # Bounded ring buffers: only the most recent turns feed prompts and the
+    # judge; older entries are already persisted via insert_message. Sized in
+    # start_session from context_turns and the persona count.
+    history: Deque[Tuple[str, str]] = dataclasses.field(default_factory=deque)  # (speaker_key, text)
+    # Hot-path caches: per-speaker system prefix (invariant per session) and
+    # pre-formatted "Name: text" lines mirroring history, each carrying its
+    # token estimate so context assembly can stop at a budget
+    sys_prefixes: Dict[str, str] = dataclasses.field(default_factory=dict)
+    formatted_history: Deque[Tuple[str, int]] = dataclasses.field(default_factory=deque)
     judge_summary: Optional[str] = None
     lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
     session_db_id: Optional[str] = None
@@ -63,9 +100,37 @@ class DebateOrchestrator:
         self.sessions: Dict[Tuple[int, Optional[int]], DebateSession] = {}
         self._tasks: Dict[Tuple[int, Optional[int]], asyncio.Task] = {}
 
+        cfg = get_settings()
+
         # Judge summary cadence (turn groups)
-        self.judge_summary_every_turns = int(os.getenv("JUDGE_SUMMARY_EVERY_TURNS", "2"))
-        self.judge_summary_max_tokens = int(os.getenv("JUDGE_SUMMARY_MAX_TOKENS", "120"))
+        self.judge_summary_every_turns = cfg.judge_summary_every_turns
+        self.judge_summary_max_tokens = cfg.judge_summary_max_tokens
+
+        # ROUND_PARALLEL=1: each cadence tick generates all personas'
+        # turns concurrently and posts them in order, so a round costs the
+        # slowest single model latency instead of K serial calls
+        self.round_parallel = cfg.round_parallel
+
+        # Observed per-persona completion latency (EWMA, ms) used to bin
+        # personas of similar speed in parallel rounds
+        self._latency_ewma: Dict[str, float] = {}
+
+        # OpenAI-compatible 'stop' supports up to 4 sequences; the persona
+        # set never changes, so build the list once
+        self._stop_list = [f"{p.name}:" for p in persona_map.values()][:4]
+        self._use_stop = cfg.use_stop
+
+        # GROQ_STREAM=1: stream completions and cut locally at the first
+        # stop sequence rather than waiting for the full generation
+        self._stream = cfg.stream
+
+        # Cap context by estimated tokens, not just line count, so a few
+        # long turns cannot balloon every subsequent prompt
+        self.context_token_budget = cfg.context_token_budget
+
+        # Judge built lazily on first summary and reused after, so every
+        # cadence summary shares one configured GenerativeModel
+        self._judge = None
 
     def _session_key(self, chat_id: int, thread_id: Optional[int]) -> Tuple[int, Optional[int]]:
         return (chat_id, thread_id)
@@ -89,11 +154,23 @@ class DebateOrchestrator:
             thread_id=thread_id,
             topic_title=topic_title,
             personas_order=turn_order,
+            n_personas=len(turn_order),
+            judge_modulus=self.judge_summary_every_turns * len(turn_order),
             active=True,
         )
+        # Keep just enough turns for prompt context plus judge look-back;
+        # floor of 32 covers the judge's 12-line window with headroom
+        histlen = max(32, self.context_turns * len(turn_order) * 2)
+        session.history = deque(maxlen=histlen)
+        session.formatted_history = deque(maxlen=histlen)
+        # Precompute each speaker's full system prefix (topic is per-session)
+        for k in turn_order:
+            p = self.persona_map.get(k)
+            if p:
+                session.sys_prefixes[k] = _build_sys_prefix(p.system_prompt, topic_title)
         # Create DB session (non-blocking) if DATABASE_URL configured
         try:
-            session.session_db_id = await asyncio.to_thread(create_debate_session, chat_id, topic_title)
+            session.session_db_id = await create_debate_session_async(chat_id, topic_title)
         except Exception:
             session.session_db_id = None
         self.sessions[key] = session
@@ -103,12 +180,8 @@ class DebateOrchestrator:
         self._tasks[key] = task
         return session
 
-    async def stop_session(self, chat_id: int, thread_id: Optional[int]) -> bool:
-        key = self._session_key(chat_id, thread_id)
-        session = self.sessions.get(key)
-        if not session:
-            return False
-        session.active = False
+    async def _teardown_session(self, key: Tuple[int, Optional[int]], session: DebateSession) -> None:
+        """Cancel the loop task and close the DB session. Caller has set active=False."""
         task = self._tasks.get(key)
         if task:
             task.cancel()
@@ -117,144 +190,242 @@ class DebateOrchestrator:
         # End DB session if exists
         if session.session_db_id:
             with contextlib.suppress(Exception):
-                await asyncio.to_thread(end_debate_session, session.session_db_id)
+                await end_debate_session_async(session.session_db_id)
+
+    async def stop_session(self, chat_id: int, thread_id: Optional[int]) -> bool:
+        key = self._session_key(chat_id, thread_id)
+        session = self.sessions.get(key)
+        if not session:
+            return False
+        session.active = False
+        await self._teardown_session(key, session)
         return True
 
     async def stop_all_sessions_for_chat(self, chat_id: int) -> int:
         """Stop every active session in a chat (all threads). Returns count stopped."""
-        keys = [k for k in list(self.sessions.keys()) if k[0] == chat_id]
-        count = 0
-        for key in keys:
-            session = self.sessions.get(key)
-            if session and session.active:
-                session.active = False
-                task = self._tasks.get(key)
-                if task:
-                    task.cancel()
-                    with contextlib.suppress(asyncio.CancelledError):
-                        await task
-                # End DB session if exists
-                if session.session_db_id:
-                    with contextlib.suppress(Exception):
-                        await asyncio.to_thread(end_debate_session, session.session_db_id)
-                count += 1
-        return count
+        to_stop = [
+            (key, session)
+            for key, session in list(self.sessions.items())
+            if key[0] == chat_id and session.active
+        ]
+        for _, session in to_stop:
+            session.active = False
+        # Teardowns are independent per session; run them concurrently so
+        # /stop_debate returns after the slowest one, not the sum
+        if to_stop:
+            await asyncio.gather(
+                *(self._teardown_session(key, session) for key, session in to_stop),
+                return_exceptions=True,
+            )
+        return len(to_stop)
 
     async def _debate_loop(self, session: DebateSession) -> None:
         try:
             while session.active:
                 await asyncio.sleep(self.cadence_seconds)
                 try:
-                    await self._post_next_turn(session)
+                    if self.round_parallel:
+                        await self._run_round(session)
+                    else:
+                        await self._post_next_turn(session)
                 except Exception as e:  # noqa: BLE001
                     # swallow errors to keep loop alive
-                    print(f"[debate_loop] error: {e}")
+                    logger.warning("[debate_loop] error: %s", e, exc_info=True)
         except asyncio.CancelledError:
             return
 
     def _build_messages(self, session: DebateSession, speaker: Persona) -> List[dict]:
         # Build Chat Completions style messages
-        sys = (
-            speaker.system_prompt
-            + "\nBahasa: Indonesia."
-            + "\nInstruksi penting: jangan menyalin atau menulis label/nama persona (mis. 'Alpha-001:', 'Beta-002:', 'Gamma-003:', 'Delta-004:') atau frasa 'Ringkasan Juri'. Mulai langsung dengan bullet poin, tanpa heading/prefiks nama."
-            + "\nGaya: ringkas, maksimal 4 bullet dengan prefix '• '; kalimat pendek."
-            + "\nRespons: tanggapi 1–2 poin terakhir lawan secara spesifik (kutip singkat jika perlu)."
-            + "\nLarangan: jangan mengulang poin yang sudah Anda sampaikan pada giliran sebelumnya."
-            + "\nTambah: berikan minimal 1 argumen/analogi/contoh/data baru untuk maju ke depan."
-            + "\nJika ada ringkasan juri di konteks, gunakan hanya sebagai rujukan; jangan tulis frasa 'Ringkasan Juri' dan jangan mengomentari juri."
-            + f"\nTopik: {session.topic_title}\n"
-        )
+        sys = session.sys_prefixes.get(speaker.key)
+        if sys is None:
+            # Fallback for speakers added after start_session
+            sys = _build_sys_prefix(speaker.system_prompt, session.topic_title)
+            session.sys_prefixes[speaker.key] = sys
         messages: List[dict] = [{"role": "system", "content": sys}]
 
-        # Add last context_turns from history as alternating user/assistant snippets
-        # Simplify: add combined recent context as a user message
-        recent = session.history[-self.context_turns :]
-        if recent:
-            ctx_text = []
-            for spk_key, text in recent:
-                name = self.persona_map.get(spk_key).name if spk_key in self.persona_map else spk_key
-                ctx_text.append(f"{name}: {text}")
-            messages.append({"role": "user", "content": "\n".join(ctx_text)})
+        # Add recent history as a combined user message; lines are
+        # pre-formatted as "Name: text" with their token estimate when
+        # appended. Walk newest-first and stop at context_turns lines or
+        # the token budget, whichever comes first.
+        if self.context_turns and session.formatted_history:
+            recent: List[str] = []
+            budget = self.context_token_budget
+            for line, est_tokens in reversed(session.formatted_history):
+                if recent and (len(recent) >= self.context_turns or est_tokens > budget):
+                    break
+                recent.append(line)
+                budget -= est_tokens
+            recent.reverse()
+            # single-line case needs no join
+            messages.append({"role": "user", "content": recent[0] if len(recent) == 1 else "\n".join(recent)})
         if session.judge_summary:
             messages.append({"role": "user", "content": f"Ringkasan Juri: {session.judge_summary}"})
         return messages
 
     async def _post_next_turn(self, session: DebateSession) -> None:
+        # Hold the lock only to snapshot state and to append the result;
+        # the Groq call itself (the slow part) runs unlocked so /tick and
+        # /summary don't stall behind a generation in flight.
         async with session.lock:
             if not session.active:
                 return
-            speaker_key = session.personas_order[session.turn_index % len(session.personas_order)]
+            speaker_key = session.personas_order[session.turn_index % session.n_personas]
             speaker = self.persona_map[speaker_key]
             bot = self.persona_bots.get(speaker_key)
+            # Reserve the index before releasing: a /tick racing the
+            # cadence loop gets the next speaker, not a duplicate
+            session.turn_index += 1
             if not bot:
                 # skip if bot missing
-                session.turn_index += 1
                 return
-
             messages = self._build_messages(session, speaker)
+
+        usage = None
+        try:
+            # OpenAI-compatible 'stop' supports up to 4 sequences. Keep persona labels only.
+            text, usage = await self._timed_chat(speaker, messages, self._stop_list if self._use_stop else None)
+        except Exception as e:  # noqa: BLE001
+            text = f"(gagal generate: {e})"
             usage = None
-            try:
-                # OpenAI-compatible 'stop' supports up to 4 sequences. Keep persona labels only.
-                stop_list = [f"{p.name}:" for p in self.persona_map.values()][:4]
-                use_stop = os.getenv("GROQ_USE_STOP", "1") == "1"
-                text, usage = self.groq.chat(
-                    model=speaker.model,
-                    messages=messages,
-                    temperature=speaker.temperature,
-                    max_tokens=self.max_tokens,
-                    stop=stop_list if use_stop else None,
-                    return_usage=True,
-                )
-            except Exception as e:  # noqa: BLE001
-                text = f"(gagal generate: {e})"
-                usage = None
 
-            # send to chat (thread if exists)
-            try:
-                msg = await bot.send_message(
-                    chat_id=session.chat_id,
-                    text=text,
-                    message_thread_id=session.thread_id,
-                    disable_notification=True,
+        async with session.lock:
+            if not session.active:
+                return
+            await self._deliver_turn(session, speaker, text, usage)
+
+            # judge summary cadence
+            if (
+                self.judge_bot
+                and session.judge_modulus
+                and session.turn_index % session.judge_modulus == 0
+            ):
+                await self._post_judge_summary(session)
+
+    async def _deliver_turn(self, session: DebateSession, speaker: Persona, text: str, usage: Optional[dict]) -> None:
+        """Post one generated turn to Telegram and log it.
+
+        Caller holds session.lock and has already advanced turn_index when
+        reserving this turn.
+        """
+        bot = self.persona_bots.get(speaker.key)
+        if not bot:
+            return
+
+        # DB writes just enqueue onto the batched writer, so call them
+        # inline; only the Telegram send actually awaits network I/O.
+        if session.session_db_id and usage:
+            with contextlib.suppress(Exception):
+                insert_usage(
+                    session.session_db_id,
+                    session.chat_id,
+                    session.thread_id,
+                    "groq",
+                    speaker.model,
+                    "assistant",
+                    usage,
+                    {"persona_key": speaker.key},
                 )
-            except Exception as e:  # noqa: BLE001
-                print(f"[send_message] error: {e}")
-                msg = None
+        try:
+            msg = await bot.send_message(
+                chat_id=session.chat_id,
+                text=text,
+                message_thread_id=session.thread_id,
+                disable_notification=True,
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.warning("[send_message] error: %s", e)
+            msg = None
 
-            session.history.append((speaker_key, text))
-            session.turn_index += 1
+        session.history.append((speaker.key, text))
+        line = f"{speaker.name}: {text}"
+        # ~1.3 tokens per word is close enough for a budget check
+        session.formatted_history.append((line, int(len(line.split()) * 1.3) + 1))
 
-            # log to DB if configured
-            if session.session_db_id:
-                with contextlib.suppress(Exception):
-                    await asyncio.to_thread(
-                        insert_message,
-                        session.session_db_id,
-                        text,
-                        getattr(msg, "message_id", None) if msg else None,
-                        "assistant",
-                    )
-                # token usage (Groq)
-                if usage:
-                    with contextlib.suppress(Exception):
-                        await asyncio.to_thread(
-                            insert_usage,
-                            session.session_db_id,
-                            session.chat_id,
-                            session.thread_id,
-                            "groq",
-                            speaker.model,
-                            "assistant",
-                            usage,
-                            {"persona_key": speaker_key},
-                        )
+        # log to DB if configured
+        if session.session_db_id:
+            with contextlib.suppress(Exception):
+                insert_message(
+                    session.session_db_id,
+                    text,
+                    getattr(msg, "message_id", None) if msg else None,
+                    "assistant",
+                )
+
+    async def _timed_chat(self, speaker: Persona, messages: List[dict], stop: Optional[List[str]]):
+        """Groq chat wrapper that feeds the per-persona latency EWMA."""
+        t0 = time.monotonic()
+        chat = self.groq.chat_stream if self._stream else self.groq.chat
+        try:
+            return await chat(
+                model=speaker.model,
+                messages=messages,
+                temperature=speaker.temperature,
+                max_tokens=self.max_tokens,
+                stop=stop,
+                return_usage=True,
+            )
+        finally:
+            elapsed_ms = (time.monotonic() - t0) * 1000.0
+            prev = self._latency_ewma.get(speaker.key)
+            self._latency_ewma[speaker.key] = (
+                elapsed_ms if prev is None else prev + 0.3 * (elapsed_ms - prev)
+            )
+
+    def _latency_bins(self, speakers: List[Persona]) -> List[List[Persona]]:
+        """Group personas whose latency EWMA falls within ±25% of the bin head.
+
+        Unmeasured personas (no EWMA yet) share the first bin.
+        """
+        ordered = sorted(speakers, key=lambda sp: self._latency_ewma.get(sp.key, 0.0))
+        bins: List[List[Persona]] = []
+        for sp in ordered:
+            lat = self._latency_ewma.get(sp.key, 0.0)
+            if bins:
+                head_lat = self._latency_ewma.get(bins[-1][0].key, 0.0)
+                if (head_lat == 0.0 and lat == 0.0) or (head_lat and abs(lat - head_lat) <= 0.25 * head_lat):
+                    bins[-1].append(sp)
+                    continue
+            bins.append([sp])
+        return bins
+
+    async def _run_round(self, session: DebateSession) -> None:
+        """Generate a full round concurrently, posting bin by bin.
+
+        Personas are grouped into latency bins so fast models post as soon
+        as their bin finishes instead of waiting for the slowest model;
+        within a bin every persona sees the same frozen history snapshot
+        and results post in personas_order. Across bins the posting order
+        follows bin latency, not personas_order.
+        """
+        async with session.lock:
+            if not session.active:
+                return
+            speakers = [self.persona_map[k] for k in session.personas_order if k in self.persona_map]
+            if not speakers:
+                return
+            stop = self._stop_list if self._use_stop else None
+            order = {k: i for i, k in enumerate(session.personas_order)}
+
+            for bin_speakers in self._latency_bins(speakers):
+                batches = [self._build_messages(session, sp) for sp in bin_speakers]
+                results = await asyncio.gather(
+                    *[self._timed_chat(sp, msgs, stop) for sp, msgs in zip(bin_speakers, batches)],
+                    return_exceptions=True,
+                )
+                # bins are latency-sorted; restore debate order for posting
+                for sp, res in sorted(zip(bin_speakers, results), key=lambda pr: order.get(pr[0].key, 0)):
+                    if isinstance(res, BaseException):
+                        text, usage = f"(gagal generate: {res})", None
+                    else:
+                        text, usage = res
+                    session.turn_index += 1
+                    await self._deliver_turn(session, sp, text, usage)
 
             # judge summary cadence
             if (
                 self.judge_bot
-                and self.judge_summary_every_turns > 0
-                and (session.turn_index % (self.judge_summary_every_turns * len(session.personas_order)) == 0)
+                and session.judge_modulus
+                and session.turn_index % session.judge_modulus == 0
             ):
                 await self._post_judge_summary(session)
 
@@ -265,8 +436,12 @@ class DebateOrchestrator:
         except Exception:
             return
 
-        judge = GeminiJudge()
-        recent_texts = [t for _, t in session.history[-(self.context_turns * len(session.personas_order)) :]]
+        if self._judge is None:
+            self._judge = GeminiJudge()
+        judge = self._judge
+        n = len(session.history)
+        keep = self.context_turns * session.n_personas
+        recent_texts = [t for _, t in islice(session.history, max(0, n - keep), n)]
         usage = None
         try:
             res = await judge.summarize(recent_texts, max_tokens=self.judge_summary_max_tokens, return_usage=True)
@@ -287,14 +462,13 @@ class DebateOrchestrator:
                     disable_notification=True,
                 )
             except Exception as e:  # noqa: BLE001
-                print(f"[judge_send] error: {e}")
+                logger.warning("[judge_send] error: %s", e)
                 msg = None
 
             # log judge summary to DB as system role
             if session.session_db_id:
                 with contextlib.suppress(Exception):
-                    await asyncio.to_thread(
-                        insert_message,
+                    insert_message(
                         session.session_db_id,
                         f"[Ringkasan Juri]\n{summary}",
                         getattr(msg, "message_id", None) if msg else None,
@@ -302,8 +476,7 @@ class DebateOrchestrator:
                     )
                 if usage:
                     with contextlib.suppress(Exception):
-                        await asyncio.to_thread(
-                            insert_usage,
+                        insert_usage(
                             session.session_db_id,
                             session.chat_id,
                             session.thread_id,
@@ -329,20 +502,36 @@ class DailyScheduler:
         self.judge_bot = judge_bot
         self.orchestrator = orchestrator
         self.tz_offset_minutes = tz_offset_minutes
+        self._tz = dt.timezone(dt.timedelta(minutes=tz_offset_minutes))
+        self._hh: int = 9
+        self._mm: int = 0
         self._task: Optional[asyncio.Task] = None
         self._topics: List[str] = []
         self._topic_idx: int = 0
 
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stop(self) -> bool:
+        """Cancel the daily task if running. Returns True when one was cancelled."""
+        if not self.is_running():
+            return False
+        self._task.cancel()
+        self._task = None
+        return True
+
     def start(self, chat_id: int, daily_time: str, topics: List[str], turn_order: List[str]) -> None:
         if self._task and not self._task.done():
             self._task.cancel()
+        # daily_time format: HH:MM; parse once instead of per wakeup
+        self._hh, self._mm = (int(x) for x in daily_time.split(":", 1))
         self._topics = topics or []
         self._topic_idx = 0
-        self._task = asyncio.create_task(self._run(chat_id, daily_time, turn_order))
+        self._task = asyncio.create_task(self._run(chat_id, turn_order))
 
-    async def _run(self, chat_id: int, daily_time: str, turn_order: List[str]) -> None:
+    async def _run(self, chat_id: int, turn_order: List[str]) -> None:
         while True:
-            delay = self._seconds_until(daily_time)
+            delay = self._seconds_until()
             await asyncio.sleep(delay)
             # Attempt to create forum topic (needs admin rights)
             thread_id = None
@@ -358,18 +547,13 @@ class DailyScheduler:
                     text=f"Topik hari ini: <b>{topic_title}</b>",
                 )
             except Exception as e:  # noqa: BLE001
-                print(f"[create_forum_topic] error: {e}")
+                logger.warning("[create_forum_topic] error: %s", e)
 
             await self.orchestrator.start_session(chat_id=chat_id, topic_title=topic_title, turn_order=turn_order, thread_id=thread_id)
 
-    def _seconds_until(self, daily_time: str) -> int:
-        # daily_time format: HH:MM
-        hh, mm = [int(x) for x in daily_time.split(":", 1)]
-        offset = dt.timedelta(minutes=self.tz_offset_minutes)
-        now_utc = dt.datetime.utcnow().replace(tzinfo=dt.timezone.utc)
-        now_local = now_utc + offset
-        target_local = now_local.replace(hour=hh, minute=mm, second=0, microsecond=0)
-        if target_local <= now_local:
-            target_local = target_local + dt.timedelta(days=1)
-        delta = (target_local - now_local).total_seconds()
-        return int(delta)
+    def _seconds_until(self) -> float:
+        now = dt.datetime.now(self._tz)
+        target = now.replace(hour=self._hh, minute=self._mm, second=0, microsecond=0)
+        if target <= now:
+            target += dt.timedelta(days=1)
+        return max(0.0, (target - now).total_seconds())
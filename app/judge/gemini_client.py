@@ -1,11 +1,30 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import logging
 import os
+import re
 from typing import List, Tuple, Dict, Any
 
 import google.generativeai as genai
 
+from app.config import get_settings
+from app.llm.cache import default_cache
+from app.judge.singleflight import SingleFlight
+
+# Judge summaries and topic lists repeat verbatim (retries, synchronized
+# daily starts); a hit skips the Gemini call entirely
+_response_cache = default_cache()
+
+# Concurrent sessions summarizing the same window share one Gemini call
+_single_flight = SingleFlight()
+
+logger = logging.getLogger(__name__)
+
+# Leading bullets/numbering on generated topic lines: "- ", "• ", "1. ", "2) "
+_PREFIX_RE = re.compile(r"^\s*(?:[-•]\s*|\d+[.)]\s*)+")
+
 
 class GeminiJudge:
     def __init__(self, api_key: str | None = None, model_name: str | None = None) -> None:
@@ -14,9 +33,20 @@ class GeminiJudge:
             raise RuntimeError("GEMINI_API_KEY is not set")
         genai.configure(api_key=self.api_key)
         self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        # Reuse one model object across calls instead of rebuilding per request
+        self._model = genai.GenerativeModel(self.model_name)
+        self._log_usage = get_settings().log_token_usage
 
     def _summarize_sync(self, texts: List[str], max_tokens: int, return_usage: bool = False):
-        model = genai.GenerativeModel(self.model_name)
+        # Same key shape as summarize()'s singleflight: model, token
+        # budget, then the context window, '|'-separated
+        cache_key = hashlib.sha256(
+            (f"{self.model_name}|{max_tokens}|" + "\n".join(texts[-12:])).encode()
+        ).hexdigest()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            text, usage_dict = cached
+            return (text, usage_dict) if return_usage else text
         prompt = (
             "Anda adalah moderator debat yang ringkas (juri). Bahasa: Indonesia.\n"
             "Ringkaslah giliran terakhir dalam 3 bullet poin pendek, lalu beri 1 saran untuk giliran berikutnya.\n"
@@ -25,37 +55,48 @@ class GeminiJudge:
             "Konteks:\n" + "\n---\n".join(texts[-12:])
         )
         config = genai.types.GenerationConfig(max_output_tokens=max_tokens, temperature=0.4)
-        resp = model.generate_content(prompt, generation_config=config)
+        resp = self._model.generate_content(prompt, generation_config=config)
         text = getattr(resp, "text", "(no content)")
         # Optional usage logging
         usage_obj = getattr(resp, "usage_metadata", None) or getattr(resp, "usageMetadata", None)
         usage_dict: Dict[str, Any] | None = None
-        if os.getenv("LOG_TOKEN_USAGE"):
+        if self._log_usage:
             try:
-                print(
-                    f"[gemini_usage] model={self.model_name} usage="
-                    f"{getattr(usage_obj, 'to_dict', lambda: usage_obj)() if usage_obj else None}"
+                logger.info(
+                    "[gemini_usage] model=%s usage=%s",
+                    self.model_name,
+                    getattr(usage_obj, "to_dict", lambda: usage_obj)() if usage_obj else None,
                 )
             except Exception:
                 pass
+        try:
+            usage_dict = {
+                "input_tokens": getattr(usage_obj, "input_token_count", None),
+                "output_tokens": getattr(usage_obj, "output_token_count", None),
+                "total_token_count": getattr(usage_obj, "total_token_count", None),
+            }
+        except Exception:
+            usage_dict = None
+        _response_cache.put(cache_key, (text, usage_dict))
         if return_usage:
-            try:
-                usage_dict = {
-                    "input_tokens": getattr(usage_obj, "input_token_count", None),
-                    "output_tokens": getattr(usage_obj, "output_token_count", None),
-                    "total_token_count": getattr(usage_obj, "total_token_count", None),
-                }
-            except Exception:
-                usage_dict = None
             return text, usage_dict
         return text
 
     async def summarize(self, texts: List[str], max_tokens: int = 120, return_usage: bool = False):
-        return await asyncio.to_thread(self._summarize_sync, texts, max_tokens, return_usage)
+        key = hashlib.sha256(
+            (f"{self.model_name}|{max_tokens}|" + "\n".join(texts[-12:])).encode()
+        ).hexdigest()
+        text, usage_dict = await _single_flight.run(
+            key, lambda: asyncio.to_thread(self._summarize_sync, texts, max_tokens, True)
+        )
+        return (text, usage_dict) if return_usage else text
 
     def _generate_topics_sync(self, keyword: str | None, count: int) -> List[str]:
-        model = genai.GenerativeModel(self.model_name)
         kw = keyword.strip() if keyword else ""
+        cache_key = hashlib.sha256(f"{self.model_name}|topics|{kw}|{count}".encode()).hexdigest()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
         instr = (
             "Buat daftar topik debat Indonesia yang ringkas dan menarik. "
             f"Jumlah: {count}. "
@@ -64,33 +105,12 @@ class GeminiJudge:
         if kw:
             instr += f"Fokus pada tema: {kw}. "
         prompt = instr + "Jawab hanya daftar topik."
-        resp = model.generate_content(prompt)
+        resp = self._model.generate_content(prompt)
         text = getattr(resp, "text", "")
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        cleaned: List[str] = []
-        for l in lines:
-            l = l.lstrip("-• ")
-            # remove leading numbering like 1. or 1)
-            if ". " in l[:4]:
-                try:
-                    int(l.split(".", 1)[0])
-                    l = l.split(".", 1)[1].strip()
-                except Exception:
-                    pass
-            if ") " in l[:4]:
-                try:
-                    int(l.split(")", 1)[0])
-                    l = l.split(")", 1)[1].strip()
-                except Exception:
-                    pass
-            cleaned.append(l)
-        # ensure unique & limit
-        out: List[str] = []
-        for t in cleaned:
-            if t and t not in out:
-                out.append(t)
-            if len(out) >= count:
-                break
+        # strip bullets/numbering in one regex pass, dedupe preserving order
+        cleaned = (_PREFIX_RE.sub("", l).strip() for l in text.splitlines())
+        out = list(dict.fromkeys(t for t in cleaned if t))[:count]
+        _response_cache.put(cache_key, out)
         return out
 
     async def generate_topics(self, keyword: str | None = None, count: int = 10) -> List[str]:
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight task.
+
+    The first caller runs the work; everyone arriving with the same key
+    before it finishes awaits the same task and shares its result. The
+    entry is removed as soon as the task completes, so later calls run
+    fresh (and can hit the response cache instead).
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        # shield: one waiter being cancelled must not cancel the shared task
+        return await asyncio.shield(task)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class LRUTTLCache:
+    """Small in-memory LRU cache with per-entry TTL.
+
+    Keys are caller-provided digests (e.g. SHA-256 of the request payload)
+    so cached prompts never sit in memory verbatim.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            ts, value = item
+            if time.monotonic() - ts > self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+def default_cache() -> LRUTTLCache:
+    """Build a cache sized from the LLM_CACHE_* env vars."""
+    return LRUTTLCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+    )
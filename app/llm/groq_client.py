@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
 import httpx
+import orjson
 from typing import List, Dict, Any
 
+from app.config import get_settings
+from app.llm.cache import default_cache
+
+# Shared across clients: identical payloads (retries, warm-up prompts)
+# skip the HTTPS + generation round trip entirely
+_response_cache = default_cache()
+
+logger = logging.getLogger(__name__)
+
 
 class GroqClient:
     def __init__(self, api_key: str | None = None, base_url: str | None = None) -> None:
@@ -11,15 +23,23 @@ class GroqClient:
         if not self.api_key:
             raise RuntimeError("GROQ_API_KEY is not set")
         self.base_url = base_url or "https://api.groq.com/openai/v1"
-        self._client = httpx.Client(timeout=60.0)
-
-    def chat(self,
-             model: str,
-             messages: List[Dict[str, Any]],
-             temperature: float = 0.7,
-             max_tokens: int = 512,
-             stop: list[str] | None = None,
-             return_usage: bool = False) -> str | tuple[str, Any]:
+        # One shared HTTP/2 client: keep-alive pool amortizes TCP/TLS
+        # handshakes across turns; auth header set once, not per call
+        self._client = httpx.AsyncClient(
+            timeout=60.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60),
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+        self._log_usage = get_settings().log_token_usage
+
+    async def chat(self,
+                   model: str,
+                   messages: List[Dict[str, Any]],
+                   temperature: float = 0.7,
+                   max_tokens: int = 512,
+                   stop: list[str] | None = None,
+                   return_usage: bool = False) -> str | tuple[str, Any]:
         """Call Groq chat completions (OpenAI-compatible) and return text content."""
         payload = {
             "model": model,
@@ -29,19 +49,95 @@ class GroqClient:
         }
         if stop:
             payload["stop"] = stop
-        resp = self._client.post(
+        body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        cache_key = hashlib.sha256(body).hexdigest()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            text, usage = cached
+            return (text, usage) if return_usage else text
+        resp = await self._client.post(
             f"{self.base_url}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-            },
-            json=payload,
+            content=body,
+            headers={"Content-Type": "application/json"},
         )
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
         text = data["choices"][0]["message"]["content"]
         usage = data.get("usage")
-        if os.getenv("LOG_TOKEN_USAGE"):
-            print(f"[groq_usage] model={model} usage={usage}")
+        _response_cache.put(cache_key, (text, usage))
+        if self._log_usage:
+            logger.info("[groq_usage] model=%s usage=%s", model, usage)
+        if return_usage:
+            return text, usage
+        return text
+
+    async def chat_stream(self,
+                          model: str,
+                          messages: List[Dict[str, Any]],
+                          temperature: float = 0.7,
+                          max_tokens: int = 512,
+                          stop: list[str] | None = None,
+                          return_usage: bool = False) -> str | tuple[str, Any]:
+        """Streaming variant of chat(): accumulate deltas and stop early.
+
+        Stop sequences are also matched locally so the connection closes as
+        soon as one appears, instead of paying for the rest of the
+        completion. Same return shape as chat().
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        if stop:
+            payload["stop"] = stop
+        body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        cache_key = hashlib.sha256(body).hexdigest()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            text, usage = cached
+            return (text, usage) if return_usage else text
+        parts: List[str] = []
+        usage: Any = None
+        truncated = False
+        async with self._client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            content=body,
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                chunk = orjson.loads(data)
+                choices = chunk.get("choices") or []
+                if choices:
+                    piece = (choices[0].get("delta") or {}).get("content")
+                    if piece:
+                        parts.append(piece)
+                        if stop:
+                            joined = "".join(parts)
+                            cut = min((i for i in (joined.find(sq) for sq in stop) if i != -1), default=-1)
+                            if cut != -1:
+                                parts = [joined[:cut]]
+                                truncated = True
+                                break
+                u = (chunk.get("x_groq") or {}).get("usage") or chunk.get("usage")
+                if u:
+                    usage = u
+        text = "".join(parts)
+        # A locally-truncated stream has no final usage chunk; skip caching it
+        if not truncated:
+            _response_cache.put(cache_key, (text, usage))
         if return_usage:
             return text, usage
         return text
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
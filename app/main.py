@@ -1,34 +1,48 @@
+# Heavy dependencies (yaml, psycopg, aiogram, uvicorn, the app modules)
+# import inside the code paths that use them, so check-config and --help
+# don't pay for the full bot stack
+import copy
+import functools
 import os
+from collections import deque
 import argparse
 import asyncio
-import yaml
-from dotenv import load_dotenv
-
-from app.db.supabase_client import apply_migration
-from app.llm.groq_client import GroqClient
-from app.debate.orchestrator import DebateOrchestrator, Persona, DailyScheduler
-from app.telegram.handlers import build_router, State
-from app.web import app as web_app, set_bot_running
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from uvicorn import Config, Server
+import sys
+import logging
+import logging.handlers
+import queue
 
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(ROOT_DIR)
 
 
+@functools.lru_cache(maxsize=32)
+def _read_yaml_cached(path: str, mtime_ns: int):
+    import yaml
+
+    try:  # libyaml-backed parser; pure-Python fallback when unavailable
+        from yaml import CSafeLoader
+    except ImportError:  # pragma: no cover
+        from yaml import SafeLoader as CSafeLoader
+
+    # binary handle: libyaml decodes UTF-8 itself and streams without an
+    # intermediate Python string
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=CSafeLoader)
+
+
 def read_yaml(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    # mtime in the cache key means edits invalidate automatically; deep
+    # copy so callers can't mutate the cached document
+    return copy.deepcopy(_read_yaml_cached(path, os.stat(path).st_mtime_ns))
 
 
 def check_config():
     groq_set = bool(os.getenv("GROQ_API_KEY"))
     db_url = os.getenv("DATABASE_URL")
     tokens_raw = os.getenv("TELEGRAM_BOT_TOKENS", "")
-    token_count = len([t for t in tokens_raw.split(",") if t.strip()])
+    token_count = sum(1 for t in tokens_raw.split(",") if t.strip())
 
     personas_cfg = read_yaml(os.path.join(PROJECT_ROOT, "config", "personas.yaml"))
     models_cfg = read_yaml(os.path.join(PROJECT_ROOT, "config", "models.yaml"))
@@ -41,16 +55,20 @@ def check_config():
     print(f"DATABASE_URL: {'set' if db_url else 'missing'}")
     print(f"TELEGRAM_BOT_TOKENS: {token_count} provided")
 
-    missing_models = [p for p in personas if p not in model_map]
+    # one traversal: resolve each persona's model and spot the gaps
+    mapped = {p: model_map.get(p) for p in personas}
+    missing_models = [p for p, m in mapped.items() if m is None]
     if missing_models:
         print("Model mapping missing for personas:", ", ".join(missing_models))
     else:
         print("Model mapping complete:")
-        for p in personas:
-            print(f"  - {p}: {model_map[p]}")
+        for p, m in mapped.items():
+            print(f"  - {p}: {m}")
 
 
 def init_db() -> int:
+    from app.db.supabase_client import apply_migration
+
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
         print("DATABASE_URL is missing in environment.")
@@ -71,28 +89,78 @@ def init_db() -> int:
         return 2
 
 
-def main():
+# Subcommand registry: name -> (help text, runner). Runners are lambdas
+# so dispatch stays lazy with respect to run()'s heavy imports.
+CMDS = {
+    "check-config": ("Validate environment and configs", lambda: check_config()),
+    "init-db": ("Apply database migrations", lambda: sys.exit(init_db())),
+    "run": ("Start judge and debate orchestrator (Telegram bots)", lambda: asyncio.run(run())),
+}
+
+
+@functools.lru_cache(maxsize=4)
+def _load_dotenv_cached(mtime_ns: int) -> None:
+    from dotenv import load_dotenv
+
     load_dotenv()
 
+
+def _load_env() -> None:
+    """Load .env once per file version; repeat calls are cache hits."""
+    try:
+        mtime_ns = os.stat(os.path.join(PROJECT_ROOT, ".env")).st_mtime_ns
+    except OSError:
+        mtime_ns = -1
+    _load_dotenv_cached(mtime_ns)
+
+
+def main():
     parser = argparse.ArgumentParser(prog="bot-colosseum", description="Multi-bot debate scaffold")
     sub = parser.add_subparsers(dest="cmd")
-    sub.add_parser("check-config", help="Validate environment and configs")
-    sub.add_parser("init-db", help="Apply database migrations")
-    sub.add_parser("run", help="Start judge and debate orchestrator (Telegram bots)")
+    # Register only the requested subparser; fall back to all of them so
+    # --help and bare invocations still list every command
+    candidate = sys.argv[1] if len(sys.argv) > 1 else None
+    if candidate in CMDS:
+        sub.add_parser(candidate, help=CMDS[candidate][0])
+    else:
+        for name, (help_text, _runner) in CMDS.items():
+            sub.add_parser(name, help=help_text)
 
     args = parser.parse_args()
 
-    if args.cmd == "check-config":
-        check_config()
-    elif args.cmd == "init-db":
-        raise SystemExit(init_db())
-    elif args.cmd == "run":
-        asyncio.run(run())
+    if args.cmd in CMDS:
+        # only executing commands need the environment; --help and bare
+        # invocations skip the .env disk read entirely
+        _load_env()
+        CMDS[args.cmd][1]()
     else:
         parser.print_help()
 
 
+def setup_logging() -> None:
+    """Route log records through a queue so handler I/O happens off the event loop."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
 async def run() -> None:
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.enums import ParseMode
+    from uvicorn import Config, Server
+
+    from app.llm.groq_client import GroqClient
+    from app.debate.orchestrator import DebateOrchestrator, Persona, DailyScheduler
+    from app.telegram.handlers import build_router, State
+    from app.web import app as web_app, set_bot_running
+
+    setup_logging()
+
     # Load configs
     personas_cfg = read_yaml(os.path.join(PROJECT_ROOT, "config", "personas.yaml"))
     models_cfg = read_yaml(os.path.join(PROJECT_ROOT, "config", "models.yaml"))
@@ -100,7 +168,7 @@ async def run() -> None:
 
     persona_defs = personas_cfg.get("personas", [])
     model_map = models_cfg.get("models", {})
-    topics = [t.get("title") for t in topics_cfg.get("topics", []) if t.get("title")]
+    topics = deque(t.get("title") for t in topics_cfg.get("topics", []) if t.get("title"))
 
     # Build persona objects and turn order
     personas: list[Persona] = []
@@ -135,11 +203,13 @@ async def run() -> None:
     if not judge_token:
         raise RuntimeError("TELEGRAM_JUDGE_TOKEN is not set")
 
-    # Create bots
-    judge_bot = Bot(token=judge_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    # Create bots on one shared session: a single TLS pool to
+    # api.telegram.org instead of one per bot
+    bot_session = AiohttpSession()
+    judge_bot = Bot(token=judge_token, session=bot_session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
     persona_bots = {}
     for i, key in enumerate(turn_order):
-        persona_bots[key] = Bot(token=tokens[i], default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+        persona_bots[key] = Bot(token=tokens[i], session=bot_session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
     # Orchestrator settings
     cadence_seconds = int(os.getenv("DEBATE_CADENCE_SECONDS", "120"))
@@ -189,7 +259,11 @@ async def run() -> None:
         await server.serve()
     
     # Run both tasks concurrently
-    await asyncio.gather(run_web(), run_bot())
+    try:
+        await asyncio.gather(run_web(), run_bot())
+    finally:
+        await groq.aclose()
+        await bot_session.close()
 
 
 if __name__ == "__main__":
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import re
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Deque, List, Dict, Optional, Tuple
 
 from aiogram import Router, Bot, F
 from aiogram.filters import Command
 from aiogram.enums import ChatMemberStatus
-from aiogram.types import Message
+from aiogram.types import ChatMemberUpdated, Message
 
 from app.debate.orchestrator import DebateOrchestrator, DailyScheduler
-from app.db.supabase_client import get_usage_summary, ensure_topic
+from app.db.supabase_client import get_usage_summary, ensure_topic, ensure_topics_bulk
 
 
 @dataclass
@@ -20,27 +25,71 @@ class State:
     judge_bot: Bot
     persona_bots: Dict[str, Bot]
     turn_order: List[str]
-    topics: List[str]
+    # deque: /next_topic rotates with O(1) popleft/append
+    topics: Deque[str]
+
+
+# Lazily built judge shared across /gen_topics calls; reusing one
+# instance keeps the configured client (and its connections) warm
+_gemini_judge = None
+
+
+def _get_judge():
+    global _gemini_judge
+    if _gemini_judge is None:
+        from app.judge.gemini_client import GeminiJudge
+
+        _gemini_judge = GeminiJudge()
+    return _gemini_judge
+
+
+# Command-argument patterns, compiled once at import. /usage is left
+# unanchored at the end so trailing junk doesn't drop a valid hours arg;
+# the /gen_topics keyword group is lazy and may span several words.
+_USAGE_RE = re.compile(r"^/usage(?:@\S+)?(?:\s+(\d+))?")
+_ADD_TOPIC_RE = re.compile(r"^/add_topic(?:@\S+)?\s+(.+?)\s*$", re.S)
+_GEN_TOPICS_RE = re.compile(r"^/gen_topics(?:@\S+)?(?:\s+(.+?))??(?:\s+(\d+))?\s*$")
+
+# Admin membership changes rarely; cache (chat_id, user_id) -> status for
+# a minute so repeat commands skip the get_chat_member round trip
+_ADMIN_CACHE: Dict[Tuple[int, int], Tuple[bool, float]] = {}
+_ADMIN_CACHE_TTL = 60.0
 
 
 async def _is_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
+    key = (chat_id, user_id)
+    cached = _ADMIN_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[1] < _ADMIN_CACHE_TTL:
+        return cached[0]
     try:
         member = await bot.get_chat_member(chat_id, user_id)
-        return member.status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR}
+        is_admin = member.status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR}
     except Exception:
         return False
+    _ADMIN_CACHE[key] = (is_admin, time.monotonic())
+    return is_admin
 
 
 def build_router(state: State) -> Router:
     router = Router(name="judge_router")
 
+    def admin_only(handler):
+        """Gate a handler behind the (cached) admin check."""
+
+        @functools.wraps(handler)
+        async def wrapper(message: Message) -> None:
+            if not message.from_user:
+                return
+            if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
+                await message.reply("Perintah ini khusus admin.")
+                return
+            await handler(message)
+
+        return wrapper
+
     @router.message(Command("start_debate"))
+    @admin_only
     async def start_debate(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
 
         topic_title = None
         if message.text:
@@ -62,27 +111,19 @@ def build_router(state: State) -> Router:
         await message.reply(f"Debat dimulai. Topik: {topic_title}")
 
     @router.message(Command("stop_debate"))
+    @admin_only
     async def stop_debate(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
         thread_id = getattr(message, "message_thread_id", None)
         ok = await state.orchestrator.stop_session(message.chat.id, thread_id)
         await message.reply("Debat dihentikan." if ok else "Tidak ada sesi aktif.")
 
     @router.message(Command("next_topic"))
+    @admin_only
     async def next_topic(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
         # Stop current sessions first, then advance topic by creating new forum topic
         await state.orchestrator.stop_all_sessions_for_chat(message.chat.id)
         # advance to next topic by creating new forum topic
-        title = state.topics.pop(0) if state.topics else "Topik Baru"
+        title = state.topics.popleft() if state.topics else "Topik Baru"
         state.topics.append(title)
         thread_id = None
         try:
@@ -101,12 +142,8 @@ def build_router(state: State) -> Router:
         await message.reply(f"Topik berikutnya dimulai: {title}")
 
     @router.message(Command("summary"))
+    @admin_only
     async def summary(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
         thread_id = getattr(message, "message_thread_id", None)
         ok = await state.orchestrator.post_summary_now(message.chat.id, thread_id)
         if ok:
@@ -115,12 +152,8 @@ def build_router(state: State) -> Router:
             await message.reply("Tidak ada sesi atau juri non-aktif.")
 
     @router.message(Command("tick"))
+    @admin_only
     async def tick(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
         thread_id = getattr(message, "message_thread_id", None)
         sess = state.orchestrator.get_session(message.chat.id, thread_id)
         if not sess or not sess.active:
@@ -134,12 +167,8 @@ def build_router(state: State) -> Router:
             await message.reply(f"Gagal mengeksekusi tick: {e}")
 
     @router.message(Command("enable_daily"))
+    @admin_only
     async def enable_daily(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
         # Use 09:00 local (+08:00) by default; can be overridden via env in runner when scheduler created
         state.scheduler.start(
             chat_id=message.chat.id,
@@ -150,36 +179,19 @@ def build_router(state: State) -> Router:
         await message.reply("Penjadwalan harian diaktifkan (09:00).")
 
     @router.message(Command("disable_daily"))
+    @admin_only
     async def disable_daily(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
-        # cancel task if any
-        if state.scheduler._task and not state.scheduler._task.done():  # noqa: SLF001
-            state.scheduler._task.cancel()  # noqa: SLF001
-            await asyncio.sleep(0)
+        if state.scheduler.stop():
             await message.reply("Penjadwalan harian dimatikan.")
         else:
             await message.reply("Tidak ada penjadwalan aktif.")
 
     @router.message(Command("usage"))
+    @admin_only
     async def usage(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
         # parse hours
-        hours = 24
-        if message.text:
-            parts = message.text.split()
-            if len(parts) >= 2:
-                try:
-                    hours = max(1, int(parts[1]))
-                except Exception:
-                    hours = 24
+        m = _USAGE_RE.match(message.text or "")
+        hours = max(1, int(m.group(1))) if m and m.group(1) else 24
         thread_id = getattr(message, "message_thread_id", None)
         rows = await asyncio.to_thread(get_usage_summary, message.chat.id, hours, thread_id)
         if not rows:
@@ -196,17 +208,10 @@ def build_router(state: State) -> Router:
         await message.reply("\n".join(lines))
 
     @router.message(Command("add_topic"))
+    @admin_only
     async def add_topic(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
-        title = None
-        if message.text:
-            parts = message.text.split(maxsplit=1)
-            if len(parts) > 1:
-                title = parts[1].strip()
+        m = _ADD_TOPIC_RE.match(message.text or "")
+        title = m.group(1) if m else None
         if not title:
             await message.reply("Gunakan: /add_topic <judul_topik>")
             return
@@ -218,48 +223,43 @@ def build_router(state: State) -> Router:
 
     @router.message(Command("list_topics"))
     async def list_topics(message: Message) -> None:
-        if not state.topics:
+        n = len(state.topics)
+        if not n:
             await message.reply("Daftar topik kosong.")
             return
-        preview = "\n".join([f"{i+1}. {t}" for i, t in enumerate(state.topics[:20])])
-        extra = "" if len(state.topics) <= 20 else f"\n(+{len(state.topics)-20} lainnya)"
-        await message.reply(f"Total topik: {len(state.topics)}\n{preview}{extra}")
+        # islice + generator: no [:20] slice copy, no intermediate list
+        preview = "\n".join(f"{i+1}. {t}" for i, t in enumerate(islice(state.topics, 20)))
+        extra = "" if n <= 20 else f"\n(+{n-20} lainnya)"
+        await message.reply(f"Total topik: {n}\n{preview}{extra}")
 
     @router.message(Command("gen_topics"))
+    @admin_only
     async def gen_topics(message: Message) -> None:
-        if not message.from_user:
-            return
-        if not await _is_admin(state.judge_bot, message.chat.id, message.from_user.id):
-            await message.reply("Perintah ini khusus admin.")
-            return
-        # parse: /gen_topics [keyword] [count]
+        # parse: /gen_topics [keyword...] [count]
         keyword = None
         count = 10
-        if message.text:
-            parts = message.text.split(maxsplit=2)
-            if len(parts) >= 2:
-                if parts[1].isdigit():
-                    count = max(1, min(50, int(parts[1])))
-                else:
-                    keyword = parts[1].strip()
-            if len(parts) == 3:
-                try:
-                    count = max(1, min(50, int(parts[2])))
-                except Exception:
-                    pass
+        m = _GEN_TOPICS_RE.match(message.text or "")
+        if m:
+            keyword = m.group(1)
+            if m.group(2):
+                count = max(1, min(50, int(m.group(2))))
         try:
-            from app.judge.gemini_client import GeminiJudge
-            gj = GeminiJudge()
+            gj = _get_judge()
             topics = await gj.generate_topics(keyword=keyword, count=count)
         except Exception as e:  # noqa: BLE001
             await message.reply(f"Gagal membuat topik via Gemini: {e}")
             return
         state.topics.extend(topics)
-        # persist each to DB (best-effort)
-        await asyncio.gather(*[asyncio.to_thread(ensure_topic, t) for t in topics])
+        # persist to DB in one bulk insert (best-effort)
+        await asyncio.to_thread(ensure_topics_bulk, topics)
         preview = "\n".join([f"- {t}" for t in topics])
         await message.reply(f"Ditambahkan {len(topics)} topik baru:\n{preview}")
 
+    @router.chat_member()
+    async def on_chat_member_updated(event: ChatMemberUpdated) -> None:
+        # promotion/demotion invalidates the cached admin status immediately
+        _ADMIN_CACHE.pop((event.chat.id, event.new_chat_member.user.id), None)
+
     @router.message(F.text == "/status")
     async def status(message: Message) -> None:
         thread_id = getattr(message, "message_thread_id", None)
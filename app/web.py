@@ -1,35 +1,44 @@
 import os
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-import asyncio
+import time
 
-app = FastAPI(title="Bot Colosseum Health Check")
+import orjson
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+# Read once at import; probes hit /health every few seconds
+_ENV = os.getenv("ENV", "unknown")
 
 # Global variable to track if the bot is running
 bot_running = False
 
-@app.get("/health")
-async def health_check():
+# /ready payloads never vary, so the bodies are prebuilt
+_READY_OK = b'{"status":"ready"}'
+_READY_NOT = b'{"status":"not ready"}'
+
+
+async def health_check(request):
     """Health check endpoint for Koyeb deployment"""
-    status = {
-        "status": "healthy" if bot_running else "starting",
-        "bot_running": bot_running,
-        "environment": os.getenv("ENV", "unknown"),
-        "timestamp": asyncio.get_event_loop().time()
-    }
-    
-    if bot_running:
-        return JSONResponse(status, status_code=200)
-    else:
-        return JSONResponse(status, status_code=503)
+    body = orjson.dumps(
+        {
+            "status": "healthy" if bot_running else "starting",
+            "bot_running": bot_running,
+            "environment": _ENV,
+            "timestamp": time.monotonic(),
+        }
+    )
+    return Response(body, status_code=200 if bot_running else 503, media_type="application/json")
 
-@app.get("/ready")
-async def readiness_check():
+
+async def readiness_check(request):
     """Readiness check endpoint"""
     if bot_running:
-        return JSONResponse({"status": "ready"}, status_code=200)
-    else:
-        return JSONResponse({"status": "not ready"}, status_code=503)
+        return Response(_READY_OK, media_type="application/json")
+    return Response(_READY_NOT, status_code=503, media_type="application/json")
+
+
+app = Starlette(routes=[Route("/health", health_check), Route("/ready", readiness_check)])
+
 
 def set_bot_running(status: bool):
     """Set the bot running status"""
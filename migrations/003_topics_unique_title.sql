@@ -0,0 +1,2 @@
+-- Topics are upserted by title; enforce uniqueness so ON CONFLICT (title) works
+create unique index if not exists topics_title_key on topics (title);
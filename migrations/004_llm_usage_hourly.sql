@@ -0,0 +1,30 @@
+-- Hourly rollup of llm_usage so summaries read O(buckets) instead of
+-- scanning every usage row; maintained by the batched writer
+create table if not exists llm_usage_hourly (
+  bucket timestamptz not null,
+  chat_id bigint not null,
+  thread_id bigint not null default 0,  -- 0 = no forum thread
+  provider text not null,
+  model_name text not null,
+  prompt_tokens bigint not null default 0,
+  completion_tokens bigint not null default 0,
+  total_tokens bigint not null default 0,
+  primary key (bucket, chat_id, thread_id, provider, model_name)
+);
+
+-- One-time backfill from llm_usage so pre-rollup history stays visible
+-- to /usage; idempotent via the primary-key conflict clause
+insert into llm_usage_hourly (bucket, chat_id, thread_id, provider, model_name, prompt_tokens, completion_tokens, total_tokens)
+select
+  date_trunc('hour', created_at),
+  chat_id,
+  coalesce(thread_id, 0),
+  provider,
+  model_name,
+  coalesce(sum(prompt_tokens), 0),
+  coalesce(sum(completion_tokens), 0),
+  coalesce(sum(total_tokens), 0)
+from llm_usage
+where chat_id is not null
+group by 1, 2, 3, 4, 5
+on conflict (bucket, chat_id, thread_id, provider, model_name) do nothing;